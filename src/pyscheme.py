@@ -1,62 +1,876 @@
-definitions = {
-    "+": lambda x, y: x + y,
-    "*": lambda x, y: x * y,
-    "-": lambda x, y: x - y,
-    "/": lambda x, y: x / y,
-    "=": lambda x, y: x == y,
-    "<": lambda x, y: x < y,
-    ">": lambda x, y: x > y,
+import functools
+import operator
+import sys
+import weakref
+
+# Implemented in C, so applying a primitive does not push a Python frame.
+primitives = {
+    "+": operator.add,
+    "*": operator.mul,
+    "-": operator.sub,
+    "/": operator.truediv,
+    "=": operator.eq,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+
+# Global definitions are stored by symbol index rather than by name, so
+# lookups index a list instead of hashing a string.
+symbols = {}
+definitions = []
+
+# Placeholder for symbols that have been referenced but not yet defined.
+UNDEFINED = object()
+
+
+def symbol_index(name):
+    index = symbols.get(name)
+
+    if index is None:
+        index = symbols[name] = len(definitions)
+        definitions.append(UNDEFINED)
+
+    return index
+
+
+for name, proc in primitives.items():
+    definitions[symbol_index(name)] = proc
+
+# Memoized procedures, whose caches are cleared and checked whenever a
+# definition changes.
+memoized = weakref.WeakSet()
+
+
+(
+    OP_CONST,
+    OP_LOCAL,
+    OP_FREE,
+    OP_GLOBAL,
+    OP_DEFINE,
+    OP_IF,
+    OP_LAMBDA,
+    OP_APPLY,
+    OP_ADD,
+    OP_SUB,
+    OP_MUL,
+    OP_DIV,
+    OP_EQ,
+    OP_LT,
+    OP_GT,
+    OP_IF_LT,
+    OP_APPLY1,
+    OP_APPLY2,
+    OP_LOOP,
+) = range(19)
+
+
+# Compiled nodes are shared between identical subtrees, so they are weakly
+# referenceable to let the intern table drop unused ones.
+#
+# Each node also records in pure whether it only applies globals and makes no
+# definitions, computed from its children as it is built.
+class Node:
+    __slots__ = ("__weakref__",)
+    pure = True
+
+
+class Const(Node):
+    __slots__ = ("value", "pure")
+    op = OP_CONST
+
+    def __init__(self, value):
+        self.value = value
+        self.pure = not callable(value)
+
+
+# A parameter of the innermost lambda, read from its argument slot.
+class Local(Node):
+    __slots__ = ("index", "name")
+    op = OP_LOCAL
+
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+
+
+# A parameter of an outer lambda, read from its argument slot in the frame
+# depth levels out.
+class Free(Node):
+    __slots__ = ("depth", "index", "name")
+    op = OP_FREE
+
+    def __init__(self, depth, index, name):
+        self.depth = depth
+        self.index = index
+        self.name = name
+
+
+class Global(Node):
+    __slots__ = ("index", "name")
+    op = OP_GLOBAL
+
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+
+
+class Define(Node):
+    __slots__ = ("index", "value")
+    op = OP_DEFINE
+    pure = False
+
+    def __init__(self, index, value):
+        self.index = index
+        self.value = value
+
+
+class If(Node):
+    __slots__ = ("test", "consequent", "alternative", "pure")
+    op = OP_IF
+
+    def __init__(self, test, consequent, alternative):
+        self.test = test
+        self.consequent = consequent
+        self.alternative = alternative
+        self.pure = test.pure and consequent.pure and alternative.pure
+
+
+class Lambda(Node):
+    __slots__ = ("names", "body", "pure", "function")
+    op = OP_LAMBDA
+
+    def __init__(self, names, body):
+        self.names = names
+        self.body = body
+        self.pure = body.pure
+        self.function = emit_function(self)
+
+
+class Apply(Node):
+    __slots__ = ("head", "args", "pure")
+    op = OP_APPLY
+
+    def __init__(self, head, args):
+        self.head = head
+        self.args = args
+        self.pure = type(head) is Global and all(arg.pure for arg in args)
+
+
+# Applications with one or two operands, specialised so primitives are called
+# without building an argument list.
+class Apply1(Apply):
+    __slots__ = ()
+    op = OP_APPLY1
+
+
+class Apply2(Apply):
+    __slots__ = ()
+    op = OP_APPLY2
+
+
+# Applications of a primitive with two operands, applied inline as long as
+# the global at index still holds the primitive.
+class Binary(Node):
+    __slots__ = ("index", "x", "y", "pure")
+
+    def __init__(self, index, x, y):
+        self.index = index
+        self.x = x
+        self.y = y
+        self.pure = x.pure and y.pure
+
+
+class Add(Binary):
+    __slots__ = ()
+    op = OP_ADD
+    primitive = operator.add
+
+
+class Sub(Binary):
+    __slots__ = ()
+    op = OP_SUB
+    primitive = operator.sub
+
+
+class Mul(Binary):
+    __slots__ = ()
+    op = OP_MUL
+    primitive = operator.mul
+
+
+class Div(Binary):
+    __slots__ = ()
+    op = OP_DIV
+    primitive = operator.truediv
+
+
+class Eq(Binary):
+    __slots__ = ()
+    op = OP_EQ
+    primitive = operator.eq
+
+
+class Lt(Binary):
+    __slots__ = ()
+    op = OP_LT
+    primitive = operator.lt
+
+
+class Gt(Binary):
+    __slots__ = ()
+    op = OP_GT
+    primitive = operator.gt
+
+
+# An if whose test is a less-than comparison.
+class IfLt(If):
+    __slots__ = ()
+    op = OP_IF_LT
+
+
+# The body of a defined procedure of the form (if test base (self args...)),
+# run by rebinding the frame for each self call while the global at index
+# still holds a procedure with this body.
+class Loop(Node):
+    __slots__ = ("index", "test", "consequent", "call", "pure")
+    op = OP_LOOP
+
+    def __init__(self, index, test, consequent, call):
+        self.index = index
+        self.test = test
+        self.consequent = consequent
+        self.call = call
+        self.pure = test.pure and consequent.pure and call.pure
+
+
+# Application nodes specialised by the number of operands.
+APPLIES = {1: Apply1, 2: Apply2}
+
+# Primitives applied inline by dedicated nodes, keyed by their name.
+FUSED = {
+    "+": Add,
+    "-": Sub,
+    "*": Mul,
+    "/": Div,
+    "=": Eq,
+    "<": Lt,
+    ">": Gt,
+}
+
+# Compiled nodes keyed by kind and fields.
+interned = weakref.WeakValueDictionary()
+
+# Compiled lambdas keyed by the id of their source expression. Entries hold
+# on to the source, so its id cannot be reused while they exist.
+lambdas = {}
+
+
+def field_key(field):
+    # Key child nodes by identity, which is stable while the interned parent
+    # holding them is alive, and other fields by type and value.
+    if isinstance(field, Node):
+        return id(field)
+
+    elif isinstance(field, tuple):
+        return tuple(map(field_key, field))
+
+    # Equal floats can still differ, as 0.0 and -0.0 do, so key them by
+    # their exact representation.
+    elif type(field) is float or type(field) is complex:
+        return (type(field), repr(field))
+
+    return (type(field), field)
+
+
+def make_node(kind, *fields):
+    # Hash-cons nodes, so structurally identical subtrees compile to the same
+    # object.
+    try:
+        key = (kind,) + tuple(map(field_key, fields))
+        node = interned.get(key)
+    except TypeError:
+        return kind(*fields)
+
+    if node is None:
+        node = kind(*fields)
+        interned[key] = node
+
+    return node
+
+
+def compile_symbol(expression, scope):
+    # Resolve parameters to the frame depth and argument slot they are bound
+    # at, and globals to their index.
+    for depth, names in enumerate(scope):
+        if expression in names:
+            index = names.index(expression)
+
+            if depth == 0:
+                return make_node(Local, index, expression)
+
+            return make_node(Free, depth, index, expression)
+
+    return make_node(Global, symbol_index(expression), expression)
+
+
+def compile_define(expression, scope):
+    index = symbol_index(expression[1])
+    value = compile_expression(expression[2], scope)
+
+    if type(value) is Lambda:
+        value = lower_loop(value, index)
+
+    return make_node(Define, index, value)
+
+
+def lower_loop(node, index):
+    # Turn a lambda defined at index whose body ends in a call to itself into
+    # a loop.
+    body = node.body
+
+    if isinstance(body, If) and isinstance(body.alternative, Apply):
+        call = body.alternative
+        head = call.head
+
+        if type(head) is Global and head.index == index:
+            loop = make_node(Loop, index, body.test, body.consequent, call)
+            return make_node(Lambda, node.names, loop)
+
+    return node
+
+
+def compile_if(expression, scope):
+    test = compile_expression(expression[1], scope)
+    consequent = compile_expression(expression[2], scope)
+    alternative = compile_expression(expression[3], scope)
+    return fuse(make_node(If, test, consequent, alternative))
+
+
+def compile_lambda(expression, scope):
+    # Passing the same lambda expression to evaluate again reuses its compiled
+    # node instead of walking the body.
+    entry = lambdas.get(id(expression))
+
+    if entry is not None and entry[0] is expression and entry[1] == scope:
+        return entry[2]
+
+    names = tuple(expression[1])
+    body = compile_expression(expression[2], (names,) + scope)
+    node = make_node(Lambda, names, body)
+
+    if len(lambdas) >= 1024:
+        lambdas.clear()
+
+    lambdas[id(expression)] = (expression, scope, node)
+    return node
+
+
+def compile_application(expression, scope):
+    head = compile_expression(expression[0], scope)
+    args = tuple([compile_expression(expr, scope) for expr in expression[1:]])
+    kind = APPLIES.get(len(args), Apply)
+    return fuse(make_node(kind, head, args))
+
+
+# Interned, so heads written as string literals match by identity and the
+# lookup below never compares characters.
+DEFINE = sys.intern("define")
+IF = sys.intern("if")
+LAMBDA = sys.intern("lambda")
+
+SPECIAL_FORMS = {
+    DEFINE: compile_define,
+    IF: compile_if,
+    LAMBDA: compile_lambda,
 }
 
 
-def evaluate(expression):
+def compile_tuple(expression, scope):
+    # Separate special forms vs application of procedures with one lookup on
+    # the head.
+    compiler = compile_application
+
+    if type(expression[0]) is str:
+        compiler = SPECIAL_FORMS.get(expression[0], compile_application)
+
+    return compiler(expression, scope)
+
+
+def compile_const(expression, scope):
     # For primitives, return as is.
-    if isinstance(expression, int) or callable(expression):
-        return expression
+    return make_node(Const, expression)
+
+
+# Keyed by the exact type of the expression, so picking a compiler is one
+# dict lookup rather than a series of isinstance checks.
+COMPILERS = {str: compile_symbol, tuple: compile_tuple}
+
+
+def compile_expression(expression, scope=()):
+    compiler = COMPILERS.get(type(expression), compile_const)
+    return compiler(expression, scope)
+
+
+def fuse(node):
+    # Rewrite common shapes into single nodes that apply the primitive
+    # inline, so they take one dispatch instead of several.
+    if isinstance(node, Apply):
+        head = node.head
+
+        if type(head) is Global and head.name in FUSED and len(node.args) == 2:
+            return make_node(FUSED[head.name], head.index, *node.args)
+
+    elif type(node) is If and type(node.test) is Lt:
+        return make_node(IfLt, node.test, node.consequent, node.alternative)
+
+    return node
+
+
+def emit_python(node, names, depth, tail, constants):
+    # Translate a node to a Python expression, raising ValueError for nodes
+    # that need the interpreter.
+    if type(node) is Const:
+        value = node.value
+
+        # Other constants may have no literal form, or must keep their
+        # identity, so they are passed in by reference.
+        if type(value) is int or type(value) is bool or value is None:
+            return repr(value)
+
+        constants.append(value)
+        return f"constants[{len(constants) - 1}]"
+
+    elif type(node) is Local or type(node) is Free:
+        if node.name not in names:
+            raise ValueError("Cannot emit free variable", node.name)
+
+        return names[node.name]
+
+    elif type(node) is Global:
+        return f"load_global({node.index}, {node.name!r})"
+
+    elif isinstance(node, If):
+        test = emit_python(node.test, names, depth, False, constants)
+        consequent = emit_python(
+            node.consequent, names, depth, tail, constants
+        )
+        alternative = emit_python(
+            node.alternative, names, depth, tail, constants
+        )
+        return f"({consequent} if {test} else {alternative})"
+
+    elif type(node) is Lambda:
+        # Number parameters by nesting depth, so inner lambdas never reuse an
+        # outer parameter name.
+        params = [f"_{depth}_{i}" for i in range(len(node.names))]
+        names = {**names, **dict(zip(node.names, params))}
+        body = emit_python(node.body, names, depth + 1, True, constants)
+        return f"(lambda {', '.join(params)}: {body})"
+
+    elif isinstance(node, Apply):
+        # Python has no tail calls, and the head may be redefined to a
+        # procedure after translation, so applications in tail position are
+        # left to the interpreter.
+        if tail:
+            raise ValueError("Cannot emit tail call")
+
+        proc = emit_python(node.head, names, depth, False, constants)
+        args = [
+            emit_python(arg, names, depth, False, constants)
+            for arg in node.args
+        ]
+        return f"{proc}({', '.join(args)})"
+
+    elif isinstance(node, Binary):
+        # Called without a tail call, as evaluate_binary does, so these may
+        # stay in tail position. Fused globals are always defined.
+        x = emit_python(node.x, names, depth, False, constants)
+        y = emit_python(node.y, names, depth, False, constants)
+        return f"definitions[{node.index}]({x}, {y})"
+
+    # Pass the node rather than formatting a message: every lambda that needs
+    # the interpreter lands here, and emit_function discards the error.
+    raise ValueError("Cannot emit node", node)
+
+
+def emit_function(node):
+    # Compile lambdas that close over no local bindings to a Python function,
+    # so calls run the body without dispatching on each node.
+    constants = []
+
+    # Bodies nested too deeply for the Python parser or stack are left to the
+    # interpreter too.
+    try:
+        source = emit_python(node, {}, 0, False, constants)
+        factory = compile_python(f"lambda constants: {source}")
+    except (ValueError, SyntaxError, RecursionError, MemoryError):
+        return None
+
+    return factory(tuple(constants))
+
+
+def load_global(index, name):
+    # Read a global from translated code, failing like evaluate_global when
+    # the symbol has not been defined.
+    value = definitions[index]
+
+    if value is UNDEFINED:
+        raise KeyError(name)
+
+    return value
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_python(source):
+    # Emitted functions only read globals through definitions, and take their
+    # constants as an argument, so the same source always compiles to an
+    # interchangeable function.
+    return eval(
+        source, {"definitions": definitions, "load_global": load_global}
+    )
+
+
+def evaluate_const(node, env):
+    return node.value
+
+
+def evaluate_local(node, env):
+    return env.frames[0][node.index]
+
+
+def evaluate_free(node, env):
+    return env.frames[node.depth][node.index]
+
+
+def evaluate_global(node, env):
+    value = definitions[node.index]
+
+    if value is UNDEFINED:
+        raise KeyError(node.name)
+
+    return value
+
+
+def evaluate_define(node, env):
+    value = node.value
+    result = HANDLERS[value.op](value, env)
+
+    # Defined procedures that only apply globals return equal results for
+    # equal arguments until a definition changes, so calls can be served
+    # from a cache.
+    if type(value) is Lambda and value.pure:
+        result.memoize()
+
+    definitions[node.index] = result
+    check_memoized()
+
+
+def check_memoized():
+    # Memoized results may depend on the previous definition, and a cache may
+    # only serve calls while every global its procedure applies holds a
+    # primitive or another procedure served from a cache. Start from all
+    # caches and drop failing ones until none change, so procedures that
+    # apply each other keep theirs.
+    procs = list(memoized)
+
+    for proc in procs:
+        proc.memo.cache_clear()
+        proc.cache = proc.memo
+
+    changed = True
+
+    while changed:
+        changed = False
+
+        for proc in procs:
+            if proc.cache is not None and not all(
+                is_cacheable(definitions[index]) for index in proc.applies
+            ):
+                proc.cache = None
+                changed = True
+
+
+def is_cacheable(value):
+    if type(value) is Procedure:
+        return value.cache is not None
+
+    return any(value is primitive for primitive in primitives.values())
+
+
+def evaluate_binary(node, env):
+    x = node.x
+    y = node.y
+    x = HANDLERS[x.op](x, env)
+    y = HANDLERS[y.op](y, env)
+    primitive = node.primitive
+
+    if definitions[node.index] is primitive:
+        return primitive(x, y)
+
+    return definitions[node.index](x, y)
+
+
+# The arguments of each enclosing call by position, innermost first, so a
+# lexical address indexes straight into its frame.
+class Environment:
+    __slots__ = ("frames",)
+
+    def __init__(self, values, parent=None):
+        if parent is None:
+            self.frames = (values,)
+        else:
+            self.frames = (values,) + parent.frames
+
+
+def extend(env, arity, arguments):
+    # Slots are read by position, so a wrong number of arguments would
+    # silently bind the wrong values instead of failing.
+    if len(arguments) != arity:
+        raise TypeError(f"expected {arity} arguments, got {len(arguments)}")
+
+    return Environment(arguments, env)
+
+
+# Created each time a lambda expression is evaluated, so kept slotted like
+# the frames it binds.
+class Procedure:
+    __slots__ = (
+        "body",
+        "env",
+        "arity",
+        "function",
+        "cache",
+        "memo",
+        "applies",
+        "__weakref__",
+    )
+
+    def __init__(self, body, env, arity, function):
+        self.body = body
+        self.env = env
+        self.arity = arity
+        self.function = function
+        self.cache = None
+
+    def memoize(self):
+        # Cache a function that does not refer back to the procedure, so the
+        # procedure and its cache form no reference cycle.
+        function = self.function
+
+        if function is None:
+            function = functools.partial(run, self.body, self.env, self.arity)
+
+        # The cache is only used while check_memoized finds the globals the
+        # body applies free of side effects.
+        self.memo = functools.lru_cache(maxsize=1024, typed=True)(function)
+        self.applies = applied_globals(self.body)
+        memoized.add(self)
+
+    def bind(self, arguments):
+        # Extend the defining environment with the arguments, without copying
+        # its bindings.
+        return extend(self.env, self.arity, arguments)
+
+    def apply(self, *arguments):
+        if self.function is not None:
+            return self.function(*arguments)
+
+        return execute(self.body, self.bind(arguments), True)
+
+    def __call__(self, *arguments):
+        if self.cache is None:
+            return self.apply(*arguments)
+
+        try:
+            return self.cache(*arguments)
+        except TypeError:
+            # Constants can pass unhashable values, which the cache cannot
+            # key on. Errors raised by the body itself propagate unchanged.
+            try:
+                hash(arguments)
+            except TypeError:
+                return self.apply(*arguments)
+
+            raise
+
+
+def evaluate_lambda(node, env):
+    return Procedure(node.body, env, len(node.names), node.function)
+
+
+def run(body, env, arity, *arguments):
+    return execute(body, extend(env, arity, arguments), True)
+
+
+def applied_globals(node):
+    # Indices of the globals a pure body applies, collected with a stack so
+    # deeply nested bodies cannot exhaust the Python stack.
+    indices = set()
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, If):
+            stack.extend((node.test, node.consequent, node.alternative))
+
+        elif type(node) is Lambda:
+            stack.append(node.body)
+
+        elif isinstance(node, Apply):
+            indices.add(node.head.index)
+            stack.extend(node.args)
+
+        elif isinstance(node, Binary):
+            indices.add(node.index)
+            stack.extend((node.x, node.y))
+
+        elif type(node) is Loop:
+            stack.extend((node.test, node.consequent, node.call))
+
+    return tuple(indices)
+
+
+def execute(
+    node,
+    env,
+    tail=False,
+    type=type,
+    If=If,
+    IfLt=IfLt,
+    Loop=Loop,
+    Apply=Apply,
+    Apply1=Apply1,
+    Apply2=Apply2,
+    Procedure=Procedure,
+    evaluate_binary=evaluate_binary,
+):
+    # Loop over expressions in tail position instead of recursing, so tail
+    # calls run in constant Python stack. Names used on every iteration are
+    # bound as defaults, making them local loads; callers never pass them.
+    while True:
+        if type(node) is If:
+            test = node.test
+
+            if HANDLERS[test.op](test, env):
+                node = node.consequent
+            else:
+                node = node.alternative
+
+            continue
+
+        elif type(node) is IfLt:
+            if evaluate_binary(node.test, env):
+                node = node.consequent
+            else:
+                node = node.alternative
+
+            continue
+
+        elif type(node) is Loop:
+            # Self calls rebind the frame in place of a procedure application,
+            # until the test holds and the consequent is evaluated.
+            test = node.test
+
+            while not HANDLERS[test.op](test, env):
+                proc = definitions[node.index]
+
+                # Once the name is redefined, apply whatever it now holds.
+                if type(proc) is not Procedure or proc.body is not node:
+                    node = node.call
+                    break
+
+                args = [HANDLERS[arg.op](arg, env) for arg in node.call.args]
+                env = extend(proc.env, proc.arity, args)
+            else:
+                node = node.consequent
+
+            continue
+
+        # Look up procedure and apply to evaluated arguments. Arities known at
+        # compile time call primitives without building an argument list.
+        elif type(node) is Apply1:
+            head = node.head
+            x = node.args[0]
+            proc = HANDLERS[head.op](head, env)
+            x = HANDLERS[x.op](x, env)
+
+            if type(proc) is not Procedure:
+                return proc(x)
+
+            args = (x,)
 
-    # For symbols, do a look-up.
-    elif isinstance(expression, str):
-        return definitions[expression]
+        elif type(node) is Apply2:
+            head = node.head
+            x, y = node.args
+            proc = HANDLERS[head.op](head, env)
+            x = HANDLERS[x.op](x, env)
+            y = HANDLERS[y.op](y, env)
 
-    # For tuples, separate special forms vs application of procedures.
-    elif isinstance(expression, tuple):
-        if expression[0] == "define":
-            definitions[expression[1]] = evaluate(expression[2])
-            return None
+            if type(proc) is not Procedure:
+                return proc(x, y)
 
-        elif expression[0] == "if":
-            if evaluate(expression[1]):
-                return evaluate(expression[2])
+            args = (x, y)
 
-            return evaluate(expression[3])
+        elif type(node) is Apply:
+            head = node.head
+            proc = HANDLERS[head.op](head, env)
+            args = [HANDLERS[expr.op](expr, env) for expr in node.args]
 
-        elif expression[0] == "lambda":
+            if type(proc) is not Procedure:
+                return proc(*args)
 
-            def substitute(expr, name, value):
-                if expr == name:
-                    return value
+        else:
+            return HANDLERS[node.op](node, env)
 
-                elif isinstance(expr, tuple):
-                    return tuple(
-                        [substitute(term, name, value) for term in expr]
-                    )
+        # Memoized procedures only skip their cache for calls in tail position
+        # of another procedure, where there is no frame left to store the
+        # result from.
+        if proc.cache is not None and not tail:
+            return proc(*args)
 
-                return expr
+        # emit_python refuses applications in tail position, so translated
+        # bodies make no tail calls of their own and running them directly
+        # cannot grow the stack across iterations.
+        if proc.function is not None:
+            return proc.function(*args)
 
-            def procedure(*arguments):
-                names = expression[1]
-                body = expression[2]
+        # Rebinding the environment drops the caller's frame before the body
+        # runs, so release the operator and operands with it.
+        node = proc.body
+        env = proc.bind(args)
+        tail = True
+        del head, proc, args
 
-                for i, argument in enumerate(arguments):
-                    name = names[i]
-                    body = substitute(body, name, argument)
 
-                return evaluate(body)
+# Indexed by opcode, so dispatch is a single tuple lookup per node.
+HANDLERS = (
+    evaluate_const,
+    evaluate_local,
+    evaluate_free,
+    evaluate_global,
+    evaluate_define,
+    execute,
+    evaluate_lambda,
+    execute,
+    evaluate_binary,
+    evaluate_binary,
+    evaluate_binary,
+    evaluate_binary,
+    evaluate_binary,
+    evaluate_binary,
+    evaluate_binary,
+    execute,
+    execute,
+    execute,
+    execute,
+)
 
-            return procedure
 
-        # Look up procedure and apply to evaluated arguments.
-        proc = evaluate(expression[0])
-        args = [evaluate(expr) for expr in expression[1:]]
+def evaluate(expression, env=None):
+    if env is None:
+        env = {}
 
-        return proc(*args)
+    names = tuple(env)
+    node = compile_expression(expression, (names,))
+    return HANDLERS[node.op](node, Environment(tuple(env.values())))
@@ -1,3 +1,5 @@
+import pytest
+
 from pyscheme import evaluate
 
 
@@ -161,3 +163,254 @@ def test_if():
 
     assert evaluate(((("if_procedure", "true"), 2), 3)) == 2
     assert evaluate(((("if_procedure", "false"), 2), 3)) == 3
+
+
+def test_scope():
+    # fmt: off
+    shadow = (
+        "lambda", ("x",),
+        (
+            ("lambda", ("x",), "x"), 2,
+        )
+    )
+
+    adder = (
+        "lambda", ("x",),
+        (
+            "lambda", ("y",), ("+", "x", "y"),
+        )
+    )
+    # fmt: on
+
+    assert evaluate((shadow, 1)) == 2
+
+    evaluate(("define", "adder", adder))
+    evaluate(("define", "add_one", ("adder", 1)))
+
+    assert evaluate(("add_one", 2)) == 3
+    assert evaluate((("adder", 10), ("add_one", 2))) == 13
+
+
+def test_memoize():
+    # fmt: off
+    fibonacci = (
+        "lambda", ("n",),
+        (
+            "if", ("<", "n", 2),
+                1,
+                ("+", ("fibonacci", ("-", "n", 2)), ("fibonacci", ("-", "n", 1))),
+        ),
+    )
+    # fmt: on
+
+    evaluate(("define", "fibonacci", fibonacci))
+    assert evaluate(("fibonacci", 80)) == 37889062373143906
+
+    evaluate(("define", "offset", 1))
+    evaluate(("define", "shift", ("lambda", ("n",), ("+", "n", "offset"))))
+    assert evaluate(("shift", 1)) == 2
+
+    evaluate(("define", "offset", 10))
+    assert evaluate(("shift", 1)) == 11
+
+
+def test_memoize_side_effects():
+    calls = []
+    evaluate(("define", "callf", ("lambda", ("f", "x"), ("f", "x"))))
+
+    evaluate(("callf", calls.append, 1))
+    evaluate(("callf", calls.append, 1))
+    assert calls == [1, 1]
+
+    evaluate(("define", "log", calls.append))
+    evaluate(("define", "log_one", ("lambda", ("x",), ("log", "x"))))
+
+    evaluate(("log_one", 2))
+    evaluate(("log_one", 2))
+    assert calls == [1, 1, 2, 2]
+
+    evaluate(("define", "add", "+"))
+    evaluate(("define", "+", ("lambda", ("x", "y"), ("log", "x"))))
+    evaluate(("define", "log_sum", ("lambda", ("x",), ("+", "x", 1))))
+
+    evaluate(("log_sum", 3))
+    evaluate(("log_sum", 3))
+    assert calls == [1, 1, 2, 2, 3, 3]
+
+    evaluate(("define", "+", "add"))
+
+
+def test_tail_call():
+    # fmt: off
+    count = (
+        "lambda", ("n",),
+        (
+            "if", ("=", "n", 0),
+                0,
+                ("count", ("-", "n", 1)),
+        ),
+    )
+    # fmt: on
+
+    evaluate(("define", "count", count))
+    assert evaluate(("count", 100000)) == 0
+
+
+def test_redefine_primitive():
+    evaluate(("define", "add", "+"))
+    evaluate(("define", "+", "*"))
+    assert evaluate(("+", 3, 4)) == 12
+    assert evaluate((("lambda", ("x",), ("+", "x", "x")), 3)) == 9
+
+    evaluate(("define", "+", "add"))
+    assert evaluate(("+", 3, 4)) == 7
+
+
+def test_mutual_tail_call():
+    # fmt: off
+    even = (
+        "lambda", ("n",),
+        (
+            "if", ("=", "n", 0),
+                ("=", 0, 0),
+                ("odd", ("-", "n", 1)),
+        ),
+    )
+
+    odd = (
+        "lambda", ("n",),
+        (
+            "if", ("=", "n", 0),
+                ("=", 0, 1),
+                ("even", ("-", "n", 1)),
+        ),
+    )
+    # fmt: on
+
+    evaluate(("define", "even", even))
+    evaluate(("define", "odd", odd))
+
+    assert evaluate(("even", 100000)) is True
+    assert evaluate(("odd", 100001)) is True
+    assert evaluate(("even", 7)) is False
+
+    # fmt: off
+    ping = (
+        "lambda", ("n", "k"),
+        ("pong", "n", "k"),
+    )
+
+    pong = (
+        "lambda", ("n", "k"),
+        (
+            "if", ("=", "n", 0),
+                "k",
+                ("ping", ("-", "n", 1), "k"),
+        ),
+    )
+    # fmt: on
+
+    # Compile ping while pong still names a primitive.
+    evaluate(("define", "pong", "+"))
+    evaluate(("define", "ping", ping))
+    evaluate(("define", "pong", pong))
+
+    assert evaluate(("ping", 100000, 7)) == 7
+
+
+def test_unhashable_argument():
+    evaluate(("define", "identity", ("lambda", ("x",), "x")))
+    assert evaluate(("identity", [1, 2])) == [1, 2]
+
+
+def test_loop_redefined():
+    # fmt: off
+    countdown = (
+        "lambda", ("n",),
+        (
+            "if", ("=", "n", 0),
+                0,
+                ("countdown", ("-", "n", 1)),
+        ),
+    )
+    # fmt: on
+
+    evaluate(("define", "countdown", countdown))
+    assert evaluate(("countdown", 5)) == 0
+
+    evaluate(("define", "previous", "countdown"))
+    evaluate(("define", "countdown", ("lambda", ("n",), 42)))
+    assert evaluate(("previous", 5)) == 42
+
+    # fmt: off
+    bad = (
+        "lambda", ("n",),
+        (
+            "if", ("=", "n", 0),
+                0,
+                ("bad", ("-", "n", 1), 5),
+        ),
+    )
+    # fmt: on
+
+    evaluate(("define", "bad", bad))
+
+    with pytest.raises(TypeError):
+        evaluate(("bad", 3))
+
+
+def test_tail_call_unhashable_global():
+    evaluate(("define", "items", [1, 2]))
+    evaluate(("define", "first", ("lambda", ("n",), ("items", "n"))))
+    evaluate(("define", "items", ("lambda", ("n",), ("*", "n", 2))))
+    assert evaluate(("first", 3)) == 6
+
+
+def test_undefined_global():
+    evaluate(("define", "later", ("lambda", ("x",), "undefined")))
+
+    with pytest.raises(KeyError):
+        evaluate(("later", 1))
+
+
+def test_constant_identity():
+    marker = object()
+    evaluate(("define", "is_marker", ("lambda", ("x",), ("=", "x", marker))))
+    assert evaluate(("is_marker", marker)) is True
+
+    infinity = float("inf")
+    evaluate(("define", "bound", ("lambda", ("x",), ("<", "x", infinity))))
+    assert evaluate(("bound", 1)) is True
+
+    items = []
+    evaluate(("define", "get_items", ("lambda", ("x",), items)))
+    assert evaluate(("get_items", 1)) is items
+
+
+def test_arity():
+    with pytest.raises(TypeError):
+        evaluate((("lambda", ("y",), "x"), 2, 3), {"x": 1})
+
+
+def test_signed_zero():
+    # Keep a node holding 0.0 alive while -0.0 is compiled.
+    evaluate(("define", "zero", ("lambda", ("x",), ("*", "x", 0.0))))
+    assert str(evaluate(("*", -0.0, 1))) == "-0.0"
+
+
+def test_deep_lambda():
+    body = "x"
+
+    for _ in range(210):
+        body = ("+", 1, body)
+
+    evaluate(("define", "deep", ("lambda", ("x",), body)))
+    assert evaluate(("deep", 0)) == 210
+
+    body = "x"
+
+    for _ in range(130):
+        body = ("if", ("=", "x", 0), body, body)
+
+    evaluate(("define", "branches", ("lambda", ("x",), body)))
+    assert evaluate(("branches", 1)) == 1